@@ -0,0 +1,25 @@
+import functools
+
+# Process-wide singletons: one LLM connection pool, one tool table and one
+# agent (with its semantic cache) shared by the API and the chat handler
+
+@functools.lru_cache(maxsize=1)
+def get_llm_client():
+    from .llm_client import OllamaClient
+    return OllamaClient()
+
+@functools.lru_cache(maxsize=1)
+def get_draft_client():
+    from config.settings import AGENT_CONFIG
+    from .llm_client import OllamaClient
+    return OllamaClient(model=AGENT_CONFIG['draft_model'])
+
+@functools.lru_cache(maxsize=1)
+def get_tool_executor():
+    from .tool_executor import ToolExecutor
+    return ToolExecutor()
+
+@functools.lru_cache(maxsize=1)
+def get_agent():
+    from .agent_core import RAGAgent
+    return RAGAgent()
@@ -1,16 +1,22 @@
-from .llm_client import OllamaClient
-from .tool_executor import ToolExecutor
-import json
-from typing import List, Dict, Any
+from . import get_llm_client, get_draft_client, get_tool_executor
+from .semantic_cache import SemanticCache
+from .token_budget import fit_messages
+from .intent_router import route
+from tools.sql_tools import SQLTools
+from config.settings import SEMANTIC_CACHE_CONFIG, AGENT_CONFIG
+import asyncio
+import orjson
+from typing import List, Dict, Any, Optional, Tuple, AsyncIterator
 import logging
 
 logger = logging.getLogger(__name__)
 
-class RAGAgent:
-    def __init__(self):
-        self.llm_client = OllamaClient()
-        self.tool_executor = ToolExecutor()
-        self.system_prompt = """You are a helpful Federal Register document assistant. You have access to a database of federal documents, regulations, and government publications.
+# Consecutive embedding failures after which the semantic cache is switched off
+EMBED_FAILURE_LIMIT = 3
+
+# Kept byte-identical across requests so Ollama can reuse the KV cache for the
+# prompt prefix; dynamic data (summaries, history) always follows it
+SYSTEM_PROMPT = """You are a helpful Federal Register document assistant. You have access to a database of federal documents, regulations, and government publications.
 
 You can help users by:
 - Searching for documents by keywords
@@ -21,29 +27,235 @@ You can help users by:
 Always use the appropriate tools to find current, accurate information from the database before responding. When presenting results, summarize the key information clearly and mention the source (Federal Register database).
 
 Be helpful, accurate, and informative in your responses."""
+
+class RAGAgent:
+    def __init__(self):
+        self.llm_client = get_llm_client()
+        self.draft_client = get_draft_client() if AGENT_CONFIG['draft_model'] else None
+        self.tool_executor = get_tool_executor()
+        self.semantic_cache = SemanticCache(self.llm_client) if SEMANTIC_CACHE_CONFIG['enabled'] else None
+        if self.semantic_cache:
+            # Cached answers describe the database as it was; drop them when an ingest changes it
+            SQLTools.on_invalidate(self.semantic_cache.clear)
+        self.system_prompt = SYSTEM_PROMPT
+        
+        # Rough token estimate (~4 characters per token) of the static prefix to pin
+        self.prefix_tokens = len(self.system_prompt) // 4
         
         self.max_iterations = 5  # Prevent infinite loops
+        
+        self.embed_failures = 0
+        
+        # Outcomes of speculative drafts, used to switch them off when mostly wasted
+        self.draft_stats = {"used": 0, "wasted": 0}
     
-    async def process_query(self, user_query: str, chat_history: List[Dict] = None) -> str:
-        """Process user query using agent logic with tool calling"""
+    def _build_messages(self, user_query: str, chat_history: List[Dict] = None, summary: Optional[str] = None) -> List[Dict]:
+        """Assemble the prompt messages for a query"""
         messages = [{"role": "system", "content": self.system_prompt}]
         
-        # Add chat history if provided (keep it reasonable)
+        if summary:
+            messages.append({"role": "system", "content": f"Prior conversation summary: {summary}"})
+        
+        # Add as much recent history as fits the token budget to avoid context overflow
         if chat_history:
-            # Keep only last 6 messages to avoid context overflow
-            recent_history = chat_history[-6:] if len(chat_history) > 6 else chat_history
-            messages.extend(recent_history)
+            messages.extend(fit_messages(chat_history, AGENT_CONFIG['history_token_budget']))
         
         messages.append({"role": "user", "content": user_query})
+        return messages
+    
+    async def _lookup_cache(self, user_query: str, chat_history: List[Dict] = None,
+                            summary: Optional[str] = None) -> Tuple[Optional[Any], Optional[str]]:
+        """Return the query embedding and a cached response, if any.
+        
+        Follow-ups depend on their conversation, which the cache key does not
+        capture, so only standalone queries are looked up (and later stored).
+        """
+        if not self.semantic_cache or chat_history or summary:
+            return None, None
+        
+        query_embedding = await self.semantic_cache.embed(user_query)
+        if query_embedding is None:
+            # A single timeout is transient, but repeated failures usually mean the
+            # embedding model is missing; stop paying for a failing request per query
+            self.embed_failures += 1
+            if self.embed_failures >= EMBED_FAILURE_LIMIT:
+                logger.warning("Embedding failed %d times in a row, disabling the semantic cache", self.embed_failures)
+                self.semantic_cache = None
+            return None, None
+        
+        self.embed_failures = 0
+        return query_embedding, self.semantic_cache.lookup(query_embedding)
+    
+    async def _route_intent(self, messages: List[Dict], user_query: str, tool_digests: Dict[str, str],
+                            loaded_tools: set) -> bool:
+        """Run the tool for an obvious intent up front, skipping the LLM's tool-selection turn.
+
+        The tool result is attached to the user message so a single completion
+        can format the answer. Returns True if the query was routed.
+        """
+        routed = route(user_query)
+        if not routed:
+            return False
+        
+        tool_name, tool_args = routed
+        # The model may want the routed tool again with other arguments, so send its full schema
+        loaded_tools.add(tool_name)
+        tool_result = await self.tool_executor.execute_tool(tool_name, tool_args)
+        if self.semantic_cache:
+            signature, digest = self.semantic_cache.record_tool_result(tool_name, tool_args, tool_result)
+            tool_digests[signature] = digest
+        
+        messages[-1] = {
+            "role": "user",
+            "content": f"{user_query}\n\nRelevant data from the Federal Register database ({tool_name}):\n{tool_result}"
+        }
+        return True
+    
+    def _tools_for(self, loaded_tools: set) -> Optional[List[Dict]]:
+        """Tools to send with a request: full schemas for loaded tools, the compact index for the rest"""
+        if not self.llm_client.supports_tools:
+            return None
+        return self.tool_executor.get_tool_schemas_for(loaded_tools)
+    
+    def _load_requested_schemas(self, tool_calls: List[Dict], loaded_tools: set) -> bool:
+        """Load the full schema of any tool the model called from the index alone.
+        
+        Those calls were made without the parameter list, so they are dropped and
+        the request is repeated with the schema. Returns True if that is needed.
+        """
+        requested = {
+            tc["function"]["name"] for tc in tool_calls
+            if self.tool_executor.is_indexed(tc["function"]["name"])
+        } - loaded_tools
+        if not requested:
+            return False
+        
+        logger.info("Loading tool schemas for %s", sorted(requested))
+        loaded_tools.update(requested)
+        return True
+    
+    async def _execute_tool_calls(self, messages: List[Dict], content: Optional[str], tool_calls: List[Dict],
+                                  tool_digests: Dict[str, str]):
+        """Run the requested tool calls and append their results to messages"""
+        logger.info("LLM requested %d tool calls", len(tool_calls))
+        
+        # Add assistant message with tool calls
+        messages.append({
+            "role": "assistant",
+            "content": content,
+            "tool_calls": tool_calls
+        })
+        
+        async def run_tool_call(tool_call: Dict) -> Tuple[Dict, Dict, str]:
+            try:
+                tool_args = orjson.loads(tool_call["function"]["arguments"] or "{}")
+            except orjson.JSONDecodeError:
+                tool_args = {}
+            tool_result = await self.tool_executor.execute_tool(tool_call["function"]["name"], tool_args)
+            return tool_call, tool_args, tool_result
+        
+        # Tool calls are independent, so run them concurrently; gather keeps call order
+        results = await asyncio.gather(*(run_tool_call(tc) for tc in tool_calls))
+        
+        for tool_call, tool_args, tool_result in results:
+            tool_name = tool_call["function"]["name"]
+            if self.semantic_cache:
+                signature, digest = self.semantic_cache.record_tool_result(tool_name, tool_args, tool_result)
+                tool_digests[signature] = digest
+            
+            # Add tool result to messages
+            messages.append({
+                "role": "tool",
+                "tool_call_id": tool_call["id"],
+                "name": tool_name,
+                "content": tool_result
+            })
+    
+    def _draft_enabled(self, chat_history: List[Dict] = None, summary: Optional[str] = None) -> bool:
+        """Whether to race a speculative draft against the first LLM call.
+        
+        Follow-ups need the conversation, which the trimmed draft prompt leaves out.
+        """
+        if not self.draft_client or chat_history or summary:
+            return False
+        
+        total = self.draft_stats["used"] + self.draft_stats["wasted"]
+        if total < 20:
+            return True
+        return self.draft_stats["wasted"] / total <= AGENT_CONFIG['draft_max_waste_rate']
+    
+    async def _first_completion_with_draft(self, messages: List[Dict], tools: Optional[List[Dict]]) -> Tuple[Any, Optional[str]]:
+        """Race a short tool-less draft from the small draft model against the full first request.
+
+        Returns the full response and, when the draft can stand in for it, the
+        draft text. A draft is only usable if the full request made no tool
+        calls; when the client cannot return tool calls at all, a draft that
+        finishes first is returned without waiting for the full request.
+        """
+        # Only the system prompt and the latest user turn (with any routed tool data)
+        draft_task = asyncio.create_task(self.draft_client.simple_completion_fast(
+            [messages[0], messages[-1]], max_tokens=AGENT_CONFIG['draft_max_tokens'], num_keep=self.prefix_tokens
+        ))
+        full_task = asyncio.create_task(self.llm_client.chat_completion(
+            messages=messages, tools=tools, num_keep=self.prefix_tokens
+        ))
+        
+        done, _ = await asyncio.wait([draft_task, full_task], return_when=asyncio.FIRST_COMPLETED)
+        
+        if full_task in done:
+            draft_task.cancel()
+            self.draft_stats["wasted"] += 1
+            return full_task.result(), None
+        
+        draft = draft_task.result()
+        if draft and not self.llm_client.supports_tools:
+            full_task.cancel()
+            self.draft_stats["used"] += 1
+            return None, draft
+        
+        response = await full_task
+        assistant_message = response.choices[0].message if response else None
+        if draft and assistant_message is not None and not assistant_message.tool_calls:
+            self.draft_stats["used"] += 1
+            return response, draft
+        
+        self.draft_stats["wasted"] += 1
+        return response, None
+    
+    async def process_query(self, user_query: str, chat_history: List[Dict] = None, summary: Optional[str] = None) -> str:
+        """Process user query using agent logic with tool calling.
+
+        When a summary of older turns is given, chat_history is expected to be
+        already compacted by the caller to the turns the summary does not cover.
+        """
+        messages = self._build_messages(user_query, chat_history, summary)
+        
+        # Short-circuit the agent loop for questions we have already answered
+        query_embedding, cached_response = await self._lookup_cache(user_query, chat_history, summary)
+        if cached_response:
+            return cached_response
+        
+        tool_digests = {}
+        loaded_tools = set()
+        await self._route_intent(messages, user_query, tool_digests, loaded_tools)
         
         iteration = 0
         while iteration < self.max_iterations:
             try:
-                # Request LLM response with tools
-                response = await self.llm_client.chat_completion(
-                    messages=messages,
-                    tools=self.tool_executor.get_tool_schemas()
-                )
+                # Request LLM response with the tool index plus the schemas of tools in use
+                tools = self._tools_for(loaded_tools)
+                if iteration == 0 and self._draft_enabled(chat_history, summary):
+                    response, draft = await self._first_completion_with_draft(messages, tools)
+                    if draft:
+                        # Drafts are short best-effort answers, so they are never cached
+                        logger.info("Query answered by speculative draft")
+                        return draft
+                else:
+                    response = await self.llm_client.chat_completion(
+                        messages=messages,
+                        tools=tools,
+                        num_keep=self.prefix_tokens
+                    )
                 
                 if not response:
                     return "I'm sorry, I'm having trouble connecting to the AI service right now. Please try again."
@@ -52,33 +264,9 @@ Be helpful, accurate, and informative in your responses."""
                 
                 # Check if LLM wants to use tools
                 if hasattr(assistant_message, 'tool_calls') and assistant_message.tool_calls:
-                    logger.info(f"LLM requested {len(assistant_message.tool_calls)} tool calls")
-                    
-                    # Add assistant message with tool calls
-                    messages.append({
-                        "role": "assistant",
-                        "content": assistant_message.content,
-                        "tool_calls": [tc.model_dump() for tc in assistant_message.tool_calls]
-                    })
-                    
-                    # Execute each tool call
-                    for tool_call in assistant_message.tool_calls:
-                        tool_name = tool_call.function.name
-                        try:
-                            tool_args = json.loads(tool_call.function.arguments)
-                        except json.JSONDecodeError:
-                            tool_args = {}
-                        
-                        # Execute tool
-                        tool_result = await self.tool_executor.execute_tool(tool_name, tool_args)
-                        
-                        # Add tool result to messages
-                        messages.append({
-                            "role": "tool",
-                            "tool_call_id": tool_call.id,
-                            "name": tool_name,
-                            "content": tool_result
-                        })
+                    tool_calls = [tc.model_dump(mode='json') for tc in assistant_message.tool_calls]
+                    if not self._load_requested_schemas(tool_calls, loaded_tools):
+                        await self._execute_tool_calls(messages, assistant_message.content, tool_calls, tool_digests)
                     
                     # Continue to next iteration for final response
                     iteration += 1
@@ -88,14 +276,98 @@ Be helpful, accurate, and informative in your responses."""
                     # No tools needed, return direct response
                     final_response = assistant_message.content or "I'm not sure how to help with that query."
                     logger.info("Query processed successfully without tools")
+                    
+                    if query_embedding is not None and self.semantic_cache and assistant_message.content:
+                        self.semantic_cache.store(query_embedding, final_response, tool_digests)
                     return final_response
                     
             except Exception as e:
-                logger.error(f"Error in agent processing: {e}")
+                logger.exception("Error in agent processing")
                 return f"I encountered an error while processing your request: {str(e)[:100]}..."
         
         return "I tried to help but ran into some complexity issues. Could you please rephrase your question?"
     
+    async def process_query_stream(self, user_query: str, chat_history: List[Dict] = None,
+                                   summary: Optional[str] = None) -> AsyncIterator[str]:
+        """Process user query like process_query, yielding the final answer as it is generated"""
+        messages = self._build_messages(user_query, chat_history, summary)
+        
+        query_embedding, cached_response = await self._lookup_cache(user_query, chat_history, summary)
+        if cached_response:
+            yield cached_response
+            return
+        
+        tool_digests = {}
+        loaded_tools = set()
+        await self._route_intent(messages, user_query, tool_digests, loaded_tools)
+        
+        for _ in range(self.max_iterations):
+            stream = await self.llm_client.chat_completion(
+                messages=messages,
+                tools=self._tools_for(loaded_tools),
+                stream=True,
+                num_keep=self.prefix_tokens
+            )
+            
+            if not stream:
+                yield "I'm sorry, I'm having trouble connecting to the AI service right now. Please try again."
+                return
+            
+            content_parts = []
+            tool_calls = {}
+            try:
+                async for chunk in stream:
+                    if not chunk.choices:
+                        continue
+                    delta = chunk.choices[0].delta
+                    
+                    # Tool calls arrive as fragments keyed by index
+                    for tc in delta.tool_calls or []:
+                        call = tool_calls.setdefault(tc.index, {
+                            "id": None,
+                            "type": "function",
+                            "function": {"name": "", "arguments": ""}
+                        })
+                        if tc.id:
+                            call["id"] = tc.id
+                        if tc.function and tc.function.name:
+                            call["function"]["name"] += tc.function.name
+                        if tc.function and tc.function.arguments:
+                            call["function"]["arguments"] += tc.function.arguments
+                    
+                    if delta.content:
+                        content_parts.append(delta.content)
+                        if not tool_calls:
+                            yield delta.content
+            except Exception as e:
+                logger.exception("Error in agent streaming")
+                yield f"I encountered an error while processing your request: {str(e)[:100]}..."
+                return
+            finally:
+                await stream.response.aclose()
+            
+            content = "".join(content_parts)
+            if tool_calls:
+                tool_calls = [tool_calls[index] for index in sorted(tool_calls)]
+                if self._load_requested_schemas(tool_calls, loaded_tools):
+                    continue
+                try:
+                    await self._execute_tool_calls(messages, content or None, tool_calls, tool_digests)
+                except Exception as e:
+                    logger.exception("Error in agent processing")
+                    yield f"I encountered an error while processing your request: {str(e)[:100]}..."
+                    return
+                continue
+            
+            if not content:
+                yield "I'm not sure how to help with that query."
+            elif query_embedding is not None and self.semantic_cache:
+                self.semantic_cache.store(query_embedding, content, tool_digests)
+            logger.info("Streamed query processed successfully")
+            return
+        
+        yield "I tried to help but ran into some complexity issues. Could you please rephrase your question?"
+    
     async def test_agent(self) -> Dict[str, Any]:
         """Test agent functionality"""
         tests = {
@@ -0,0 +1,59 @@
+import re
+from typing import Any, Dict, Optional, Tuple
+import logging
+
+logger = logging.getLogger(__name__)
+
+# Polite lead-ins allowed before a routed phrase ("show me the ...", "what are the ...")
+_PREAMBLE = (
+    r"(?:(?:please|can you|could you)\s+)?"
+    r"(?:(?:show|give|list|get|tell)(?: me)?\s+|what (?:are|were) )?"
+    r"(?:the |all )?"
+)
+_DOCUMENTS = r"(?:(?:recent|latest|newest|new) )?(?:federal )?(?:documents|publications|regulations|rules)"
+
+# (pattern, tool name, arguments or a function building them from the match).
+# Each pattern must match the whole query: a topic, agency or other qualifier
+# ("stats on FDA recalls", "recent rules from the SEC") leaves the query to the
+# LLM, since these tools would silently drop it. Rules are tried in order.
+INTENT_RULES = [
+    (
+        _PREAMBLE + r"(?:(?:(?:database|document) )?(?:stats|statistics)(?: (?:for|of|on) (?:the )?(?:database|documents))?"
+        r"|how many documents (?:are there|in total|are in the database)"
+        r"|total (?:number of )?documents(?: in the database)?)",
+        "get_document_stats",
+        {}
+    ),
+    (
+        _PREAMBLE + r"(?:" + _DOCUMENTS + r" )?(?:published )?(?:from|in|over|during) (?:the )?(?:last|past) (?P<days>\d{1,3}) days?",
+        "get_recent_documents",
+        lambda match: {"days": int(match.group("days"))}
+    ),
+    (
+        _PREAMBLE + r"(?:recent|latest|newest) (?:federal )?(?:documents|publications|regulations|rules)",
+        "get_recent_documents",
+        {}
+    ),
+]
+
+# Compiled once at import so routing a query costs only the regex scans
+_COMPILED_RULES = [
+    (re.compile(pattern, re.IGNORECASE), tool_name, arguments)
+    for pattern, tool_name, arguments in INTENT_RULES
+]
+
+def route(query: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """Map an obvious intent straight to a (tool_name, arguments) call, or None"""
+    normalized = " ".join(query.split()).rstrip("?.! ")
+    for pattern, tool_name, arguments in _COMPILED_RULES:
+        match = pattern.fullmatch(normalized)
+        if match:
+            break
+    else:
+        return None
+    
+    if callable(arguments):
+        arguments = arguments(match)
+    
+    logger.info("Routed query to %s with args %s", tool_name, arguments)
+    return tool_name, dict(arguments)
@@ -1,6 +1,6 @@
 from openai import AsyncOpenAI
-from typing import List, Dict, Any
-import json
+import httpx
+from typing import List, Dict, Optional
 import logging
 from config.settings import OLLAMA_CONFIG
 
@@ -10,36 +10,55 @@ class OllamaClient:
     def __init__(self, model: str = None):
         self.client = AsyncOpenAI(
             base_url=OLLAMA_CONFIG['base_url'],
-            api_key="ollama"  # Required but unused for local Ollama
+            api_key="ollama",  # Required but unused for local Ollama
+            http_client=httpx.AsyncClient(
+                limits=httpx.Limits(max_connections=64, max_keepalive_connections=32)
+            )
         )
         self.model = model or OLLAMA_CONFIG['model']
+        self.embedding_model = OLLAMA_CONFIG['embedding_model']
+        self.keep_alive = OLLAMA_CONFIG['keep_alive']
+        self.supports_tools = OLLAMA_CONFIG['supports_tools']
         logger.info(f"Initialized Ollama client with model: {self.model}")
     
-    async def chat_completion(self, messages: List[Dict], tools: List[Dict] = None) -> Dict:
-        """Send chat completion request WITHOUT tools support"""
+    async def chat_completion(self, messages: List[Dict], tools: List[Dict] = None, stream: bool = False,
+                              num_keep: Optional[int] = None, max_tokens: int = 1500) -> Dict:
+        """Send chat completion request; tools are only sent when supports_tools is enabled.
+
+        With stream=True the async chunk iterator is returned instead of the
+        completed response. num_keep asks Ollama to pin that many leading
+        prompt tokens in its KV cache so a repeated prefix is not re-evaluated.
+        """
         try:
-            logger.debug(f"Sending request to {self.model} with {len(messages)} messages")
+            logger.debug("Sending request to %s with %d messages", self.model, len(messages))
             
             request_params = {
                 "model": self.model,
                 "messages": messages,
                 "temperature": 0.7,
-                "max_tokens": 1500
+                "max_tokens": max_tokens,
+                "stream": stream,
+                "extra_body": {"keep_alive": self.keep_alive}
             }
+            if num_keep:
+                request_params["extra_body"]["options"] = {"num_keep": num_keep}
             
-            # Remove tools and tool_choice to disable tool calling
-            # Commented out:
-            # if tools:
-            #     request_params["tools"] = tools
-            #     request_params["tool_choice"] = "auto"
+            # Models without tool calling reject or ignore tools, so they only get the prompt
+            if tools and self.supports_tools:
+                request_params["tools"] = tools
+                request_params["tool_choice"] = "auto"
             
             response = await self.client.chat.completions.create(**request_params)
             
-            logger.debug("Successfully received response from LLM")
+            # prompt_tokens is Ollama's prompt_eval_count: it drops when the prefix is reused
+            if not stream and response.usage:
+                logger.debug("Successfully received response from LLM (prompt_eval_count=%d)", response.usage.prompt_tokens)
+            else:
+                logger.debug("Successfully received response from LLM")
             return response
             
-        except Exception as e:
-            logger.error(f"LLM client error: {e}")
+        except Exception:
+            logger.exception("LLM client error")
             return None
     
     async def simple_completion(self, prompt: str) -> str:
@@ -51,6 +70,31 @@ class OllamaClient:
             return response.choices[0].message.content
         return "Sorry, I couldn't process that request."
     
+    async def simple_completion_fast(self, messages: List[Dict], max_tokens: int = 256,
+                                     num_keep: Optional[int] = None) -> Optional[str]:
+        """Short, tool-less completion used as a speculative draft answer.
+        
+        Returns None unless the model finished on its own; a reply cut off at
+        max_tokens is not a usable answer.
+        """
+        response = await self.chat_completion(messages, num_keep=num_keep, max_tokens=max_tokens)
+        
+        if response and response.choices and response.choices[0].finish_reason == 'stop':
+            return response.choices[0].message.content
+        return None
+    
+    async def embed(self, text: str) -> Optional[List[float]]:
+        """Get an embedding vector for text from Ollama"""
+        try:
+            response = await self.client.embeddings.create(
+                model=self.embedding_model,
+                input=text
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning("Embedding request with model %s failed: %s", self.embedding_model, e)
+            return None
+    
     async def test_connection(self) -> bool:
         """Test if connection to Ollama is working"""
         try:
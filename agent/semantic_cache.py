@@ -0,0 +1,186 @@
+import hashlib
+import time
+from typing import Dict, List, Optional, Tuple
+import logging
+
+import numpy as np
+import orjson
+
+from config.settings import SEMANTIC_CACHE_CONFIG
+
+try:
+    import faiss
+except ImportError:
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Rows added to the embedding matrix whenever it runs out of space
+GROWTH_CHUNK = 1024
+# Number of nearest candidates checked for staleness on each lookup
+TOP_K = 5
+# Entry count above which an HNSW index replaces the brute-force product
+FAISS_MIN_ENTRIES = 5000
+
+class SemanticCache:
+    """Cache of agent responses looked up by query embedding similarity.
+    
+    Embeddings are stored as one contiguous float16 matrix so a lookup is a
+    single matrix-vector product. Entries remember the digest of every tool
+    result their answer was built from. When a newer, different result is
+    observed for the same tool call the entry is considered stale and is no
+    longer served.
+    """
+    def __init__(self, llm_client, threshold: float = None, ttl: int = None, max_entries: int = None):
+        self.llm_client = llm_client
+        self.threshold = threshold or SEMANTIC_CACHE_CONFIG['similarity_threshold']
+        self.ttl = ttl or SEMANTIC_CACHE_CONFIG['ttl']
+        self.max_entries = max_entries or SEMANTIC_CACHE_CONFIG['max_entries']
+        self._embeddings: Optional[np.ndarray] = None
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._responses: List[str] = []
+        self._entry_digests: List[Dict[str, str]] = []
+        self._size = 0
+        self._index = None
+        self._tool_digests: Dict[str, str] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    async def embed(self, text: str) -> Optional[np.ndarray]:
+        """Embed text as a unit vector, or None if embedding is unavailable"""
+        vector = await self.llm_client.embed(text)
+        if not vector:
+            return None
+        
+        embedding = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        if norm == 0:
+            return None
+        return embedding / norm
+    
+    def lookup(self, embedding: np.ndarray) -> Optional[str]:
+        """Return the cached response most similar to embedding above the threshold"""
+        now = time.time()
+        
+        for position, score in self._nearest(embedding):
+            if score < self.threshold:
+                break
+            if now - self._timestamps[position] > self.ttl or not self._is_fresh(self._entry_digests[position]):
+                continue
+            
+            self.hits += 1
+            logger.info("Semantic cache hit (similarity %.3f)", score)
+            return self._responses[position]
+        
+        self.misses += 1
+        return None
+    
+    def store(self, embedding: np.ndarray, response: str, tool_digests: Dict[str, str] = None):
+        """Store a response along with the tool result digests it depends on"""
+        if self._size >= self.max_entries:
+            # Drop the oldest tenth in one pass rather than shifting on every insert
+            keep = np.ones(self._size, dtype=bool)
+            keep[:max(1, self._size // 10)] = False
+            self._compact(keep)
+        
+        if self._embeddings is None:
+            self._embeddings = np.empty((GROWTH_CHUNK, embedding.shape[0]), dtype=np.float16)
+            self._timestamps = np.empty(GROWTH_CHUNK, dtype=np.float64)
+        elif self._size == self._embeddings.shape[0]:
+            self._embeddings = np.concatenate(
+                [self._embeddings, np.empty((GROWTH_CHUNK, self._embeddings.shape[1]), dtype=np.float16)]
+            )
+            self._timestamps = np.concatenate([self._timestamps, np.empty(GROWTH_CHUNK, dtype=np.float64)])
+        
+        self._embeddings[self._size] = embedding
+        self._timestamps[self._size] = time.time()
+        self._responses.append(response)
+        self._entry_digests.append(dict(tool_digests or {}))
+        self._size += 1
+        
+        if self._index is not None:
+            self._index.add(embedding.reshape(1, -1).astype(np.float32))
+    
+    def record_tool_result(self, tool_name: str, arguments: Dict, result: str) -> Tuple[str, str]:
+        """Record the latest result of a tool call and return its (signature, digest)"""
+        signature = f"{tool_name}:{orjson.dumps(arguments, option=orjson.OPT_SORT_KEYS, default=str).decode()}"
+        digest = hashlib.sha1(result.encode('utf-8')).hexdigest()
+        self._tool_digests[signature] = digest
+        return signature, digest
+    
+    def evict_expired(self) -> int:
+        """Drop expired or stale entries, returning how many were removed"""
+        if not self._size:
+            self._tool_digests.clear()
+            return 0
+        
+        keep = time.time() - self._timestamps[:self._size] <= self.ttl
+        for position in np.flatnonzero(keep):
+            keep[position] = self._is_fresh(self._entry_digests[position])
+        
+        evicted = self._size - int(keep.sum())
+        if evicted:
+            self._compact(keep)
+            logger.info("Evicted %d semantic cache entries", evicted)
+        else:
+            # Tool calls from uncached queries still record digests
+            self._prune_tool_digests()
+        return evicted
+    
+    def clear(self):
+        """Remove all cached responses"""
+        self._embeddings = None
+        self._timestamps = np.empty(0, dtype=np.float64)
+        self._responses.clear()
+        self._entry_digests.clear()
+        self._size = 0
+        self._index = None
+        self._tool_digests.clear()
+    
+    def _nearest(self, embedding: np.ndarray) -> List[Tuple[int, float]]:
+        """Return up to TOP_K (position, score) pairs, most similar first"""
+        if not self._size:
+            return []
+        
+        k = min(TOP_K, self._size)
+        query = embedding.astype(np.float32)
+        
+        if faiss is not None and self._size >= FAISS_MIN_ENTRIES:
+            if self._index is None:
+                self._index = faiss.IndexHNSWFlat(self._embeddings.shape[1], 32, faiss.METRIC_INNER_PRODUCT)
+                self._index.add(self._embeddings[:self._size].astype(np.float32))
+            scores, positions = self._index.search(query.reshape(1, -1), k)
+            return [(int(p), float(s)) for p, s in zip(positions[0], scores[0]) if p >= 0]
+        
+        # One BLAS matrix-vector product over all entries, then a partial sort
+        scores = self._embeddings[:self._size].astype(np.float32) @ query
+        candidates = np.argpartition(-scores, k - 1)[:k]
+        candidates = candidates[np.argsort(-scores[candidates])]
+        return [(int(p), float(scores[p])) for p in candidates]
+    
+    def _compact(self, keep: np.ndarray):
+        """Keep only the entries selected by the boolean mask"""
+        count = int(keep.sum())
+        self._embeddings[:count] = self._embeddings[:self._size][keep]
+        self._timestamps[:count] = self._timestamps[:self._size][keep]
+        self._responses = [r for r, k in zip(self._responses, keep) if k]
+        self._entry_digests = [d for d, k in zip(self._entry_digests, keep) if k]
+        self._size = count
+        self._index = None  # Rebuilt on the next lookup if still needed
+        self._prune_tool_digests()
+    
+    def _prune_tool_digests(self):
+        """Forget tool call signatures that no live entry depends on"""
+        referenced = set()
+        for entry_digests in self._entry_digests:
+            referenced.update(entry_digests)
+        self._tool_digests = {
+            signature: digest for signature, digest in self._tool_digests.items() if signature in referenced
+        }
+    
+    def _is_fresh(self, entry_digests: Dict[str, str]) -> bool:
+        """Check that every tool result an entry relied on is still current"""
+        for signature, digest in entry_digests.items():
+            if self._tool_digests.get(signature, digest) != digest:
+                return False
+        return True
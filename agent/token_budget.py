@@ -0,0 +1,37 @@
+import functools
+import logging
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+@functools.lru_cache(maxsize=1)
+def _get_encoding():
+    """Load the tokenizer once, or None if tiktoken or its encoding is unavailable"""
+    try:
+        import tiktoken
+        return tiktoken.get_encoding("cl100k_base")
+    except Exception:
+        logger.warning("tiktoken unavailable, estimating token counts from text length")
+        return None
+
+@functools.lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """Count tokens in text; results are cached so old messages are not re-tokenized"""
+    encoding = _get_encoding()
+    if encoding is None:
+        return len(text) // 4 + 1
+    return len(encoding.encode(text))
+
+def fit_messages(messages: List[Dict], budget: int = 3000) -> List[Dict]:
+    """Keep the most recent messages whose combined token count fits within budget"""
+    kept = []
+    used = 0
+    for message in reversed(messages):
+        tokens = count_tokens(message.get("content") or "")
+        if used + tokens > budget:
+            break
+        kept.append(message)
+        used += tokens
+    
+    kept.reverse()
+    return kept
@@ -1,10 +1,19 @@
 from tools.sql_tools import SQLTools
-import json
-from typing import Dict, Any, List
+import orjson
+from pydantic import TypeAdapter, ValidationError, create_model
+from typing import Dict, Any, List, Tuple
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Python types for the JSON schema types used in tool parameters
+JSON_SCHEMA_TYPES = {
+    "string": str,
+    "integer": int,
+    "number": float,
+    "boolean": bool
+}
+
 class ToolExecutor:
     def __init__(self):
         self.available_tools = {
@@ -63,13 +72,13 @@ class ToolExecutor:
                 "type": "function",
                 "function": {
                     "name": "filter_by_agency",
-                    "description": "Filter federal documents by specific agency name",
+                    "description": "Filter federal documents by their lead agency (the first agency listed on a document; co-issuing agencies are not matched)",
                     "parameters": {
                         "type": "object",
                         "properties": {
                             "agency": {
                                 "type": "string",
-                                "description": "The agency name to filter by (e.g., 'Environmental Protection Agency', 'FDA')"
+                                "description": "The full agency name or its beginning to filter by (e.g., 'Environmental Protection Agency', 'Food and Drug')"
                             },
                             "limit": {
                                 "type": "integer",
@@ -93,27 +102,87 @@ class ToolExecutor:
                 }
             }
         ]
+        self._schemas_by_name = {schema["function"]["name"]: schema for schema in self.tool_schemas}
+        
+        # Name/description-only stand-ins, sent until the model picks a tool and needs its parameters;
+        # tools without parameters have nothing to leave out and always go in full
+        self._tool_index = {
+            name: {
+                "type": "function",
+                "function": {
+                    "name": name,
+                    "description": schema["function"]["description"],
+                    "parameters": {"type": "object", "properties": {}}
+                }
+            }
+            for name, schema in self._schemas_by_name.items()
+            if schema["function"]["parameters"]["properties"]
+        }
+        
+        # Schemas never change after startup, so freeze and serialize them once
+        self._tool_schemas_tuple = tuple(self.tool_schemas)
+        self._tool_schemas_bytes = orjson.dumps(self.tool_schemas)
+        
+        # Build an argument validator per tool from its schema, paired with the tool function
+        self._dispatch = {}
+        for schema in self.tool_schemas:
+            name = schema["function"]["name"]
+            parameters = schema["function"]["parameters"]
+            required = set(parameters.get("required", []))
+            fields = {
+                param: (JSON_SCHEMA_TYPES[spec["type"]], ... if param in required else spec.get("default"))
+                for param, spec in parameters["properties"].items()
+            }
+            validator = TypeAdapter(create_model(f"{name}_arguments", **fields))
+            self._dispatch[name] = (validator, self.available_tools[name])
     
     async def execute_tool(self, tool_name: str, arguments: Dict[str, Any]) -> str:
         """Execute a tool with given arguments"""
-        if tool_name not in self.available_tools:
-            logger.error(f"Tool {tool_name} not found")
+        if tool_name not in self._dispatch:
+            logger.error("Tool %s not found", tool_name)
             return f"Tool {tool_name} not found"
         
+        validator, tool_function = self._dispatch[tool_name]
+        
+        # Reject bad arguments before touching the database, in a form the LLM can correct
+        try:
+            kwargs = validator.validate_python(arguments).model_dump()
+        except ValidationError as e:
+            problems = "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'arguments'}: {error['msg']}"
+                for error in e.errors()
+            )
+            logger.warning("Invalid arguments for tool %s: %s", tool_name, problems)
+            return f"Invalid arguments for tool {tool_name}: {problems}. Call the tool again with corrected arguments."
+        
         try:
-            logger.info(f"Executing tool: {tool_name} with args: {arguments}")
-            tool_function = self.available_tools[tool_name]
-            result = await tool_function(**arguments)
-            logger.info(f"Tool {tool_name} executed successfully")
+            if logger.isEnabledFor(logging.INFO):
+                logger.info("Executing tool: %s with args: %s", tool_name, kwargs)
+            result = await tool_function(**kwargs)
+            logger.info("Tool %s executed successfully", tool_name)
             return result
         except Exception as e:
-            error_msg = f"Error executing tool {tool_name}: {e}"
-            logger.error(error_msg)
-            return error_msg
+            logger.exception("Error executing tool %s", tool_name)
+            return f"Error executing tool {tool_name}: {e}"
     
-    def get_tool_schemas(self) -> List[Dict]:
+    def get_tool_schemas(self) -> Tuple[Dict, ...]:
         """Return tool schemas for LLM"""
-        return self.tool_schemas
+        return self._tool_schemas_tuple
+    
+    def get_tool_schemas_bytes(self) -> bytes:
+        """Return tool schemas pre-serialized as JSON for raw HTTP requests"""
+        return self._tool_schemas_bytes
+    
+    def get_tool_schemas_for(self, loaded_tools: set) -> List[Dict]:
+        """Return full schemas for loaded tools and the compact index entry for the rest"""
+        return [
+            self._tool_index[name] if name in self._tool_index and name not in loaded_tools else schema
+            for name, schema in self._schemas_by_name.items()
+        ]
+    
+    def is_indexed(self, tool_name: str) -> bool:
+        """Whether a tool is sent as an index entry until its full schema is loaded"""
+        return tool_name in self._tool_index
     
     def get_available_tools(self) -> List[str]:
         """Get list of available tool names"""
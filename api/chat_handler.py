@@ -1,6 +1,8 @@
 import asyncio
-from typing import Dict, List
-from agent.agent_core import RAGAgent
+import heapq
+from collections import OrderedDict
+from typing import Dict, List, Optional, Tuple
+from agent import get_agent
 import logging
 import time
 
@@ -8,10 +10,15 @@ logger = logging.getLogger(__name__)
 
 class ChatHandler:
     def __init__(self):
-        self.agent = RAGAgent()
-        self.active_sessions = {}
-        self.session_timeouts = {}
+        self.agent = get_agent()
+        # Sessions in least-recently-used order; expiry is tracked by a heap of
+        # (expires_at, session_id) whose stale entries are skipped lazily
+        self.active_sessions: OrderedDict[str, Dict] = OrderedDict()
+        self._expiry_heap: List[Tuple[float, str]] = []
+        self.max_sessions = 10000
         self.max_history_length = 20
+        self.summary_keep_recent = 4  # Messages always passed verbatim
+        self.summary_interval = 6  # New messages needed before re-summarizing
         self.session_timeout = 3600  # 1 hour
     
     async def handle_message(self, session_id: str, message: str, history: List[Dict] = None) -> str:
@@ -22,68 +29,124 @@ class ChatHandler:
             # Clean up expired sessions
             await self._cleanup_expired_sessions()
             
-            # Use provided history or get from session
+            # Use provided history or get from session, compacting older turns
+            summary = None
             if history is None:
                 history = self.get_session_history(session_id)
+                summary, history = await self._summarize_older(session_id, history)
             
             # Process query through agent
-            response = await self.agent.process_query(message, history)
+            response = await self.agent.process_query(message, history, summary=summary)
             
             # Store in session history
             self._update_session_history(session_id, message, response)
             
             processing_time = time.time() - start_time
-            logger.info(f"Message processed in {processing_time:.2f} seconds for session {session_id}")
+            logger.info("Message processed in %.2f seconds for session %s", processing_time, session_id)
             
             return response
             
-        except Exception as e:
-            error_msg = f"Error processing message: {e}"
-            logger.error(error_msg)
+        except Exception:
+            logger.exception("Error processing message")
             return "I apologize, but I encountered an error processing your request. Please try again or rephrase your question."
     
     def _update_session_history(self, session_id: str, user_message: str, assistant_response: str):
         """Update session history with new exchange"""
-        if session_id not in self.active_sessions:
-            self.active_sessions[session_id] = []
+        session = self.active_sessions.get(session_id)
+        if session is None:
+            session = {"history": [], "summary": None, "watermark": 0, "expires_at": 0.0}
+            self.active_sessions[session_id] = session
+            
+            # Evict least recently used sessions beyond the cap
+            while len(self.active_sessions) > self.max_sessions:
+                evicted_id, _ = self.active_sessions.popitem(last=False)
+                logger.info("Evicted least recently used session %s", evicted_id)
         
         # Add new exchange
-        self.active_sessions[session_id].extend([
+        session["history"].extend([
             {"role": "user", "content": user_message},
             {"role": "assistant", "content": assistant_response}
         ])
         
         # Trim history if too long
-        if len(self.active_sessions[session_id]) > self.max_history_length:
-            self.active_sessions[session_id] = self.active_sessions[session_id][-self.max_history_length:]
+        overflow = len(session["history"]) - self.max_history_length
+        if overflow > 0:
+            session["history"] = session["history"][-self.max_history_length:]
+            session["watermark"] = max(0, session["watermark"] - overflow)
         
         # Update timeout
-        self.session_timeouts[session_id] = time.time()
+        session["expires_at"] = time.time() + self.session_timeout
+        heapq.heappush(self._expiry_heap, (session["expires_at"], session_id))
+        self.active_sessions.move_to_end(session_id)
+        
+        # Rebuild the heap once superseded entries outnumber live ones (amortized O(1))
+        if len(self._expiry_heap) > 2 * len(self.active_sessions) + 64:
+            self._expiry_heap = [(s["expires_at"], sid) for sid, s in self.active_sessions.items()]
+            heapq.heapify(self._expiry_heap)
+    
+    async def _summarize_older(self, session_id: str, messages: List[Dict]) -> Tuple[Optional[str], List[Dict]]:
+        """Collapse older messages into a rolling summary.
+
+        Returns the summary (if any) and the messages not covered by it. The
+        summary is only regenerated once enough new messages have accumulated
+        past the watermark, so one LLM call is amortized over several turns.
+        """
+        session = self.active_sessions.get(session_id)
+        summary = session["summary"] if session else None
+        watermark = session["watermark"] if session else 0
+        if summary is None and len(messages) <= self.summary_keep_recent + 2:
+            return None, messages
+        
+        cutoff = len(messages) - self.summary_keep_recent
+        
+        if summary is None or cutoff - watermark >= self.summary_interval:
+            transcript = "\n".join(f"{m['role']}: {m['content']}" for m in messages[watermark:cutoff])
+            if summary:
+                transcript = f"Earlier summary: {summary}\n{transcript}"
+            
+            prompt = (
+                "Summarize the following conversation in 120 tokens or fewer. "
+                "Preserve any user constraints, agency names, and dates.\n\n" + transcript
+            )
+            response = await self.agent.llm_client.chat_completion([{"role": "user", "content": prompt}])
+            if not response or not response.choices or not response.choices[0].message.content:
+                logger.warning("Could not summarize history for session %s", session_id)
+                return summary, messages[watermark:]
+            
+            summary = response.choices[0].message.content
+            watermark = cutoff
+            session["summary"] = summary
+            session["watermark"] = watermark
+        
+        return summary, messages[watermark:]
     
     def get_session_history(self, session_id: str) -> List[Dict]:
         """Get chat history for session"""
-        return self.active_sessions.get(session_id, [])
+        session = self.active_sessions.get(session_id)
+        return session["history"] if session else []
     
     def clear_session(self, session_id: str):
         """Clear session history"""
-        if session_id in self.active_sessions:
-            del self.active_sessions[session_id]
-        if session_id in self.session_timeouts:
-            del self.session_timeouts[session_id]
-        logger.info(f"Cleared session {session_id}")
+        self.active_sessions.pop(session_id, None)
+        logger.info("Cleared session %s", session_id)
     
     async def _cleanup_expired_sessions(self):
         """Remove expired sessions"""
         current_time = time.time()
-        expired_sessions = []
-        
-        for session_id, last_activity in self.session_timeouts.items():
-            if current_time - last_activity > self.session_timeout:
-                expired_sessions.append(session_id)
         
-        for session_id in expired_sessions:
+        while self._expiry_heap and self._expiry_heap[0][0] < current_time:
+            expires_at, session_id = heapq.heappop(self._expiry_heap)
+            session = self.active_sessions.get(session_id)
+            
+            # Skip entries superseded by later activity or an earlier clear
+            if session is None or session["expires_at"] != expires_at:
+                continue
+            
             self.clear_session(session_id)
-            logger.info(f"Expired session {session_id} cleaned up")
+            logger.info("Expired session %s cleaned up", session_id)
+        
+        if self.agent.semantic_cache:
+            self.agent.semantic_cache.evict_expired()
     
     def get_active_sessions_count(self) -> int:
         """Get number of active sessions"""
@@ -1,13 +1,17 @@
-from fastapi import FastAPI, HTTPException, BackgroundTasks
+from fastapi import FastAPI, HTTPException, BackgroundTasks, Request
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import HTMLResponse, FileResponse
+from fastapi.responses import HTMLResponse, FileResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
 from typing import List, Optional
+from contextlib import aclosing
+import asyncio
 import logging
+import orjson
 import os
 
-from agent.agent_core import RAGAgent
+from agent import get_agent
 from database.connection import db
+from config.settings import API_CONFIG
 from data_pipeline.scheduler import DataPipeline
 
 # Setup logging
@@ -20,7 +24,8 @@ logger = logging.getLogger(__name__)
 app = FastAPI(
     title="Federal Register RAG Agent System",
     description="AI-powered search and analysis of Federal Register documents",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Mount static files for UI
@@ -40,13 +45,21 @@ class PipelineRequest(BaseModel):
     days_back: Optional[int] = 1
 
 # Global instances
-agent = None
 pipeline = None
+app.state.selftest = None
+
+async def _run_selftest_bg(agent):
+    """Run the agent self-test without blocking startup"""
+    try:
+        app.state.selftest = await agent.test_agent()
+        logger.info("Agent test results: %s", app.state.selftest)
+    except Exception as e:
+        logger.error("Agent self-test failed: %s", e)
 
 @app.on_event("startup")
 async def startup_event():
     """Initialize database and agent on startup"""
-    global agent, pipeline
+    global pipeline
     
     try:
         logger.info("Starting RAG Agent System...")
@@ -55,17 +68,17 @@ async def startup_event():
         await db.create_pool()
         logger.info("Database connection pool created")
         
-        # Initialize agent
-        agent = RAGAgent()
+        # Initialize the shared agent
+        agent = get_agent()
         logger.info("RAG Agent initialized")
         
         # Initialize pipeline
         pipeline = DataPipeline()
         logger.info("Data pipeline initialized")
         
-        # Test agent functionality
-        test_results = await agent.test_agent()
-        logger.info(f"Agent test results: {test_results}")
+        # Test agent functionality in the background when enabled (needs Ollama to respond)
+        if API_CONFIG['run_startup_selftest']:
+            app.state.selftest_task = asyncio.create_task(_run_selftest_bg(agent))
         
         logger.info("RAG Agent System startup complete!")
         
@@ -104,12 +117,9 @@ async def get_chat_ui():
 async def chat_endpoint(request: ChatRequest):
     """Handle chat requests"""
     try:
-        if not agent:
-            raise HTTPException(status_code=500, detail="Agent not initialized")
-        
-        logger.info(f"Processing chat request: {request.message[:100]}...")
+        logger.info("Processing chat request: %.100s...", request.message)
         
-        response = await agent.process_query(
+        response = await get_agent().process_query(
             user_query=request.message,
             chat_history=request.chat_history
         )
@@ -121,6 +131,26 @@ async def chat_endpoint(request: ChatRequest):
         logger.error(f"Chat error: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing request: {str(e)[:200]}")
 
+@app.post("/chat/stream")
+async def chat_stream_endpoint(chat_request: ChatRequest, request: Request):
+    """Handle chat requests, streaming the answer as server-sent events"""
+    logger.info("Processing streaming chat request: %.100s...", chat_request.message)
+    
+    async def event_stream():
+        chunks = get_agent().process_query_stream(
+            user_query=chat_request.message,
+            chat_history=chat_request.chat_history
+        )
+        async with aclosing(chunks):
+            async for chunk in chunks:
+                if await request.is_disconnected():
+                    logger.info("Client disconnected, stopping stream")
+                    return
+                yield f"data: {orjson.dumps({'content': chunk}).decode()}\n\n"
+        yield "data: [DONE]\n\n"
+    
+    return StreamingResponse(event_stream(), media_type="text/event-stream")
+
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
@@ -131,19 +161,27 @@ async def health_check():
                 await cursor.execute("SELECT 1")
                 await cursor.fetchone()
         
-        # Test agent
-        agent_status = "working" if agent else "not_initialized"
-        
         return {
             "status": "healthy",
             "message": "RAG Agent System is running",
             "database": "connected",
-            "agent": agent_status
+            "agent": "working"
         }
     except Exception as e:
         logger.error(f"Health check failed: {e}")
         raise HTTPException(status_code=500, detail=f"Health check failed: {e}")
 
+@app.get("/health/ready")
+async def readiness_check():
+    """Readiness endpoint: ready once the database pool exists, independent of the LLM"""
+    if db.pool is None:
+        raise HTTPException(status_code=503, detail="Database pool not initialized")
+    
+    return {
+        "status": "ready",
+        "selftest": app.state.selftest
+    }
+
 @app.post("/pipeline/run")
 async def run_pipeline(request: PipelineRequest, background_tasks: BackgroundTasks):
     """Run data pipeline"""
@@ -198,11 +236,8 @@ async def pipeline_status():
 async def get_stats():
     """Get system statistics"""
     try:
-        if not agent:
-            raise HTTPException(status_code=500, detail="Agent not initialized")
-        
         # Get document stats through agent
-        stats_result = await agent.tool_executor.execute_tool("get_document_stats", {})
+        stats_result = await get_agent().tool_executor.execute_tool("get_document_stats", {})
         
         return {
             "system": "RAG Agent System",
@@ -216,4 +251,20 @@ async def get_stats():
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run("api.main:app", host="0.0.0.0", port=8000, reload=True)
+    
+    # Production entrypoint; `python run.py server` keeps auto-reload for development
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "asyncio"  # uvloop is not available on Windows
+    
+    uvicorn.run(
+        "api.main:app",
+        host=API_CONFIG['host'],
+        port=API_CONFIG['port'],
+        loop=loop,
+        http="httptools",
+        workers=API_CONFIG['workers'],
+        reload=False
+    )
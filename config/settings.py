@@ -3,22 +3,62 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Every API worker process opens its own MySQL pool, so the connection budget
+# below is split across workers to stay under the server's max_connections
+# (151 by default). Gunicorn deployments should set API_WORKERS to match --workers.
+API_WORKERS = int(os.getenv('API_WORKERS', 1))
+DB_MAX_CONNECTIONS = int(os.getenv('DB_MAX_CONNECTIONS', 100))
+_DB_POOL_MAXSIZE = int(os.getenv('DB_POOL_MAXSIZE', max(1, DB_MAX_CONNECTIONS // API_WORKERS)))
+
 DATABASE_CONFIG = {
     'host': os.getenv('DB_HOST', 'localhost'),
     'port': int(os.getenv('DB_PORT', 3306)),
     'user': os.getenv('DB_USER', 'root'),
     'password': os.getenv('DB_PASSWORD', ''),
-    'database': os.getenv('DB_NAME', 'rag_system')
+    'database': os.getenv('DB_NAME', 'rag_system'),
+    # Pool sizes are per worker process
+    'minsize': min(int(os.getenv('DB_POOL_MINSIZE', 2)), _DB_POOL_MAXSIZE),
+    'maxsize': _DB_POOL_MAXSIZE,
+    # Recycle connections before MySQL's wait_timeout drops them
+    'pool_recycle': int(os.getenv('DB_POOL_RECYCLE', 1800)),
+    'connect_timeout': int(os.getenv('DB_CONNECT_TIMEOUT', 10)),
+    # Skip the binary log during ingest; only safe when nothing replicates from this server
+    'bulk_skip_binlog': os.getenv('DB_BULK_SKIP_BINLOG', '0') == '1',
+    # Allow LOAD DATA LOCAL INFILE for historical backfills; the server must enable it too
+    'local_infile': os.getenv('DB_LOCAL_INFILE', '0') == '1'
 }
 
 OLLAMA_CONFIG = {
     'base_url': os.getenv('OLLAMA_URL', 'http://localhost:11434/v1'),
-    'model': os.getenv('OLLAMA_MODEL', 'llama2')
+    'model': os.getenv('OLLAMA_MODEL', 'llama2'),
+    'embedding_model': os.getenv('OLLAMA_EMBEDDING_MODEL', 'all-minilm'),
+    'keep_alive': os.getenv('OLLAMA_KEEP_ALIVE', '24h'),
+    # Send tool schemas with chat requests; only enable for models with tool calling support
+    'supports_tools': os.getenv('OLLAMA_SUPPORTS_TOOLS', 'false').lower() == 'true'
+}
+
+SEMANTIC_CACHE_CONFIG = {
+    # Needs the embedding model pulled in Ollama (`ollama pull all-minilm`)
+    'enabled': os.getenv('SEMANTIC_CACHE_ENABLED', 'false').lower() == 'true',
+    'similarity_threshold': float(os.getenv('SEMANTIC_CACHE_THRESHOLD', 0.92)),
+    'ttl': int(os.getenv('SEMANTIC_CACHE_TTL', 3600)),
+    'max_entries': int(os.getenv('SEMANTIC_CACHE_MAX_ENTRIES', 1000))
+}
+
+AGENT_CONFIG = {
+    # Small model (e.g. llama3.2:1b) raced against the main one for a quick first answer; empty disables drafts
+    'draft_model': os.getenv('DRAFT_MODEL', ''),
+    'draft_max_tokens': int(os.getenv('DRAFT_MAX_TOKENS', 256)),
+    'draft_max_waste_rate': float(os.getenv('DRAFT_MAX_WASTE_RATE', 0.7)),
+    'history_token_budget': int(os.getenv('HISTORY_TOKEN_BUDGET', 3000)),
+    'pretty_tool_results': os.getenv('PRETTY_TOOL_RESULTS', 'false').lower() == 'true'
 }
 
 API_CONFIG = {
     'host': os.getenv('API_HOST', '0.0.0.0'),
-    'port': int(os.getenv('API_PORT', 8000))
+    'port': int(os.getenv('API_PORT', 8000)),
+    'workers': API_WORKERS,
+    'run_startup_selftest': os.getenv('RUN_STARTUP_SELFTEST', '0') == '1'
 }
 
 # Federal Register API settings
@@ -1,77 +1,103 @@
 import aiohttp
 import asyncio
 from datetime import datetime, timedelta
-from typing import List, Dict
-import json
+from typing import AsyncIterator, List, Dict, Optional
+import orjson
 import logging
 from config.settings import FEDERAL_REGISTER_BASE_URL
 
 logger = logging.getLogger(__name__)
 
+# Pages fetched in parallel once the total page count is known
+MAX_CONCURRENT_PAGES = 4
+
 class FederalRegisterDownloader:
     def __init__(self):
         self.base_url = FEDERAL_REGISTER_BASE_URL
         self.session = None
+        self.failed_pages = 0  # Pages of the last iteration that could not be downloaded
     
     async def __aenter__(self):
-        self.session = aiohttp.ClientSession()
+        self._get_session()
         return self
     
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
+            self.session = None
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Create the shared HTTP session with a keep-alive connection pool"""
+        if self.session is None or self.session.closed:
+            connector = aiohttp.TCPConnector(
+                limit=8,
+                ttl_dns_cache=300,
+                keepalive_timeout=60,
+                enable_cleanup_closed=True
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                # A 1000-document page can take a while; fail on a stalled read rather than a short total
+                timeout=aiohttp.ClientTimeout(total=300, sock_read=60),
+                headers={
+                    "Accept-Encoding": "gzip",
+                    "User-Agent": "Federal-Register-RAG-Agent/1.0"
+                }
+            )
+        return self.session
+    
+    async def _fetch_page(self, params: Dict, page: int) -> Optional[Dict]:
+        """Fetch a single result page, returning None on a non-200 response"""
+        logger.info(f"Fetching page {page}")
+        
+        async with self._get_session().get(self.base_url, params={**params, 'page': page}) as response:
+            if response.status != 200:
+                logger.error(f"API request for page {page} failed with status {response.status}")
+                return None
+            
+            return orjson.loads(await response.read())
     
-    async def fetch_documents(self, start_date: str, end_date: str) -> List[Dict]:
-        """Download documents from Federal Register API"""
+    async def iter_document_pages(self, start_date: str, end_date: str) -> AsyncIterator[List[Dict]]:
+        """Yield documents page by page, downloading a window of pages concurrently"""
         params = {
             'conditions[publication_date][gte]': start_date,
             'conditions[publication_date][lte]': end_date,
             'per_page': 1000,
-            'fields[]': ['document_number', 'title', 'abstract', 
+            'fields[]': ['document_number', 'title', 'abstract',
                         'publication_date', 'agencies', 'type']
         }
         
-        if not self.session:
-            self.session = aiohttp.ClientSession()
+        logger.info(f"Fetching documents for dates {start_date} to {end_date}")
+        self.failed_pages = 0
         
-        documents = []
-        page = 1
+        # The first page tells us how many pages there are
+        first_page = await self._fetch_page(params, 1)
+        if first_page is None:
+            self.failed_pages = 1
+            return
+        if not first_page.get('results'):
+            logger.info("No results found")
+            return
         
-        try:
-            while True:
-                params['page'] = page
-                logger.info(f"Fetching page {page} for dates {start_date} to {end_date}")
-                
-                async with self.session.get(self.base_url, params=params) as response:
-                    if response.status != 200:
-                        logger.error(f"API request failed with status {response.status}")
-                        break
-                    
-                    data = await response.json()
-                    
-                    if not data.get('results'):
-                        logger.info("No more results found")
-                        break
-                    
-                    documents.extend(data['results'])
-                    logger.info(f"Retrieved {len(data['results'])} documents from page {page}")
-                    
-                    if page >= data.get('total_pages', 1):
-                        break
-                    
-                    page += 1
-                    await asyncio.sleep(0.5)  # Rate limiting
-        
-        except Exception as e:
-            logger.error(f"Error fetching documents: {e}")
-            raise
+        yield first_page['results']
+        total_pages = first_page.get('total_pages', 1)
         
-        logger.info(f"Total documents fetched: {len(documents)}")
-        return documents
+        # Fetch the remaining pages in windows, bounded to stay polite to the API
+        for window_start in range(2, total_pages + 1, MAX_CONCURRENT_PAGES):
+            pages = range(window_start, min(window_start + MAX_CONCURRENT_PAGES, total_pages + 1))
+            window = await asyncio.gather(*(self._fetch_page(params, page) for page in pages))
+            
+            for page, data in zip(pages, window):
+                if data is None:
+                    # Keep going with the other pages, but let the caller report an incomplete run
+                    self.failed_pages += 1
+                elif data.get('results'):
+                    logger.info(f"Retrieved {len(data['results'])} documents from page {page}")
+                    yield data['results']
     
-    async def fetch_recent_documents(self, days_back: int = 7) -> List[Dict]:
-        """Fetch documents from the last N days"""
+    def iter_recent_document_pages(self, days_back: int = 7) -> AsyncIterator[List[Dict]]:
+        """Yield pages of documents from the last N days"""
         end_date = datetime.now().strftime('%Y-%m-%d')
         start_date = (datetime.now() - timedelta(days=days_back)).strftime('%Y-%m-%d')
         
-        return await self.fetch_documents(start_date, end_date)
+        return self.iter_document_pages(start_date, end_date)
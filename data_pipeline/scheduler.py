@@ -1,12 +1,20 @@
 import asyncio
 from datetime import datetime, timedelta
+from typing import AsyncIterator, Callable, Dict, List
 from .downloader import FederalRegisterDownloader
 from .processor import DataProcessor
+from config.settings import DATABASE_CONFIG
 from database.connection import db
+from tools.sql_tools import SQLTools
 import logging
 
 logger = logging.getLogger(__name__)
 
+# Downloaded pages allowed to wait for the database before the downloader pauses
+PAGE_QUEUE_SIZE = 4
+# Documents gathered per LOAD DATA LOCAL INFILE during historical backfills; a smaller tail is upserted
+INFILE_BATCH_ROWS = 20000
+
 class DataPipeline:
     def __init__(self):
         self.processor = DataProcessor()
@@ -17,29 +25,29 @@ class DataPipeline:
         logger.info(f"Starting data pipeline run at {run_start}")
         
         try:
-            # Initialize database connection
-            await db.create_pool()
-            
-            # Download documents
-            async with FederalRegisterDownloader() as downloader:
-                documents = await downloader.fetch_recent_documents(days_back)
+            # Download and process documents
+            results = await self._download_and_store(
+                lambda downloader: downloader.iter_recent_document_pages(days_back)
+            )
             
-            if not documents:
-                logger.warning("No documents downloaded")
-                await self._log_pipeline_run(0, 'partial', 'No documents found')
+            if not results['total']:
+                if results['failed_pages']:
+                    logger.error("Federal Register API request failed; no documents downloaded")
+                    await self._log_pipeline_run(0, 'failed', 'Federal Register API request failed')
+                else:
+                    logger.warning("No documents downloaded")
+                    await self._log_pipeline_run(0, 'partial', 'No documents found')
                 return
             
-            # Process documents
-            logger.info(f"Processing {len(documents)} documents")
-            results = await self.processor.process_and_store(documents)
-            
             # Log results
-            if results['errors'] == 0:
+            if results['errors'] == 0 and results['failed_pages'] == 0:
                 status = 'success'
                 error_msg = None
             elif results['processed'] > 0:
                 status = 'partial'
                 error_msg = f"Processed {results['processed']}, Failed {results['errors']}"
+                if results['failed_pages']:
+                    error_msg += f", {results['failed_pages']} pages could not be downloaded"
             else:
                 status = 'failed'
                 error_msg = f"All {results['errors']} documents failed to process"
@@ -60,13 +68,15 @@ class DataPipeline:
         logger.info(f"Starting historical update from {start_date} to {end_date}")
         
         try:
-            await db.create_pool()
+            results = await self._download_and_store(
+                lambda downloader: downloader.iter_document_pages(start_date, end_date),
+                bulk_load=DATABASE_CONFIG['local_infile']
+            )
             
-            async with FederalRegisterDownloader() as downloader:
-                documents = await downloader.fetch_documents(start_date, end_date)
+            if results['failed_pages']:
+                logger.error(f"Historical update incomplete: {results['failed_pages']} pages could not be downloaded")
             
-            if documents:
-                results = await self.processor.process_and_store(documents)
+            if results['total']:
                 logger.info(f"Historical update complete: {results}")
             else:
                 logger.warning("No historical documents found")
@@ -75,6 +85,61 @@ class DataPipeline:
             logger.error(f"Historical update failed: {e}")
             raise
     
+    async def _download_and_store(
+        self,
+        fetch_pages: Callable[[FederalRegisterDownloader], AsyncIterator[List[Dict]]],
+        bulk_load: bool = False
+    ) -> Dict[str, int]:
+        """Store documents while the next pages download, with a bounded queue for backpressure"""
+        queue = asyncio.Queue(maxsize=PAGE_QUEUE_SIZE)
+        totals = {'processed': 0, 'skipped': 0, 'errors': 0, 'total': 0, 'failed_pages': 0}
+        
+        async def produce():
+            async with FederalRegisterDownloader() as downloader:
+                async for page in fetch_pages(downloader):
+                    await queue.put(page)
+                totals['failed_pages'] = downloader.failed_pages
+            await queue.put(None)
+        
+        def add(results: Dict[str, int]):
+            for key, value in results.items():
+                totals[key] += value
+        
+        async def queued_documents():
+            while (page := await queue.get()) is not None:
+                for doc in page:
+                    yield doc
+        
+        async def consume():
+            if not bulk_load:
+                # One streaming pass: documents are flushed in batches as pages arrive
+                add(await self.processor.process_and_store(queued_documents()))
+                return
+            
+            buffered = []
+            while (page := await queue.get()) is not None:
+                buffered.extend(page)
+                if len(buffered) >= INFILE_BATCH_ROWS:
+                    add(await self.processor.bulk_load_via_infile(buffered))
+                    buffered = []
+            
+            if buffered:
+                add(await self.processor.process_and_store(buffered))
+        
+        try:
+            # A failure in either stage cancels the other
+            async with asyncio.TaskGroup() as tasks:
+                tasks.create_task(produce())
+                tasks.create_task(consume())
+        except ExceptionGroup as group:
+            raise group.exceptions[0]
+        
+        # Cached tool answers may describe the database before this ingest
+        if totals['processed']:
+            SQLTools.invalidate_cache()
+        
+        return totals
+    
     async def _log_pipeline_run(self, records_processed: int, status: str, error_message: str = None):
         """Log pipeline run to database"""
         try:
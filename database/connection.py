@@ -1,4 +1,5 @@
-import aiomysql
+import asyncio
+import asyncmy
 import contextlib
 from config.settings import DATABASE_CONFIG
 import logging
@@ -8,20 +9,33 @@ logger = logging.getLogger(__name__)
 class DatabaseConnection:
     def __init__(self):
         self.pool = None
+        self._pool_lock = asyncio.Lock()
     
     async def create_pool(self):
-        """Create connection pool"""
+        """Create connection pool, unless one already exists"""
+        if self.pool is not None:
+            return
+        
+        async with self._pool_lock:
+            if self.pool is None:
+                await self._create_pool()
+    
+    async def _create_pool(self):
+        """Open the connection pool"""
         try:
-            self.pool = await aiomysql.create_pool(
+            self.pool = await asyncmy.create_pool(
                 host=DATABASE_CONFIG['host'],
                 port=DATABASE_CONFIG['port'],
                 user=DATABASE_CONFIG['user'],
                 password=DATABASE_CONFIG['password'],
-                db=DATABASE_CONFIG['database'],
-                minsize=5,
-                maxsize=20,
+                database=DATABASE_CONFIG['database'],
+                minsize=DATABASE_CONFIG['minsize'],
+                maxsize=DATABASE_CONFIG['maxsize'],
+                pool_recycle=DATABASE_CONFIG['pool_recycle'],
+                connect_timeout=DATABASE_CONFIG['connect_timeout'],
                 autocommit=False,
-                charset='utf8mb4'
+                charset='utf8mb4',
+                local_infile=DATABASE_CONFIG['local_infile']
             )
             logger.info("Database connection pool created successfully")
         except Exception as e:
@@ -31,9 +45,19 @@ class DatabaseConnection:
     @contextlib.asynccontextmanager
     async def get_connection(self):
         """Get a connection from the pool as an async context manager"""
+        if self.pool is None:
+            await self.create_pool()
+        
         conn = await self.pool.acquire()
         try:
             yield conn
+        except Exception:
+            # Never hand a half-finished transaction to the next user of this connection
+            try:
+                await conn.rollback()
+            except Exception:
+                conn.close()  # Broken connection; the pool opens a fresh one instead
+            raise
         finally:
             self.pool.release(conn)
     
@@ -42,6 +66,7 @@ class DatabaseConnection:
         if self.pool:
             self.pool.close()
             await self.pool.wait_closed()
+            self.pool = None
             logger.info("Database connection pool closed")
 
 # Global database instance
@@ -13,11 +13,12 @@ CREATE TABLE federal_documents (
     publication_date DATE,
     agency VARCHAR(100),
     document_type VARCHAR(50),
+    content_hash BINARY(16),
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
     INDEX idx_date (publication_date),
-    INDEX idx_agency (agency),
-    INDEX idx_type (document_type),
+    INDEX idx_agency_date (agency, publication_date DESC),
+    INDEX idx_type_date (document_type, publication_date DESC),
     FULLTEXT(title, abstract)
 );
 
@@ -29,6 +30,23 @@ CREATE TABLE pipeline_logs (
     error_message TEXT,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
+
+To upgrade a database created before content_hash was added
+(the pipeline uses it to skip unchanged documents):
+
+ALTER TABLE federal_documents ADD COLUMN content_hash BINARY(16) AFTER document_type;
+
+To replace the single-column agency and type indexes with the composite ones.
+They return rows in publication_date order without a filesort only for an
+equality match on the leading column (WHERE document_type = ... ORDER BY
+publication_date DESC). A range such as filter_by_agency's agency LIKE 'X%'
+still uses the index to narrow the rows, but needs a filesort for the ordering:
+
+ALTER TABLE federal_documents
+    ADD INDEX idx_agency_date (agency, publication_date DESC),
+    ADD INDEX idx_type_date (document_type, publication_date DESC),
+    DROP INDEX idx_agency,
+    DROP INDEX idx_type;
 """
 
 # This file contains the SQL schema as documentation
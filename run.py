@@ -1,12 +1,13 @@
+import argparse
 import asyncio
-import uvicorn
 import sys
 import logging
 from datetime import datetime, timedelta
 
-from data_pipeline.scheduler import DataPipeline
-from database.connection import db
-from api.main import app
+try:
+    import uvloop
+except ImportError:
+    uvloop = None  # uvloop is not available on Windows
 
 # Setup logging
 logging.basicConfig(
@@ -20,10 +21,17 @@ logging.basicConfig(
 
 logger = logging.getLogger(__name__)
 
+# The pipeline awaits thousands of HTTP and MySQL calls; libuv schedules them faster
+if uvloop is not None:
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
 async def run_data_pipeline(days_back=7):
     """Run data pipeline manually"""
     logger.info(f"Starting data pipeline for last {days_back} days")
     
+    from data_pipeline.scheduler import DataPipeline
+    from database.connection import db
+    
     try:
         await db.create_pool()
         pipeline = DataPipeline()
@@ -41,6 +49,9 @@ async def run_historical_pipeline(start_date, end_date):
     """Run historical data pipeline"""
     logger.info(f"Starting historical pipeline from {start_date} to {end_date}")
     
+    from data_pipeline.scheduler import DataPipeline
+    from database.connection import db
+    
     try:
         await db.create_pool()
         pipeline = DataPipeline()
@@ -56,76 +67,69 @@ async def run_historical_pipeline(start_date, end_date):
 
 def run_api_server():
     """Run the FastAPI server"""
+    import uvicorn
+    
     logger.info("Starting FastAPI server...")
     uvicorn.run(
         "api.main:app", 
         host="0.0.0.0", 
         port=8000, 
         reload=True,
+        loop="uvloop" if uvloop is not None else "asyncio",
         log_level="info"
     )
 
-def print_usage():
-    """Print usage instructions"""
-    print("""
-RAG Agent System - Usage Instructions
+USAGE_EXAMPLES = """examples:
+  python run.py                                   Start the API server
+  python run.py pipeline --days 30                Get last 30 days of data
+  python run.py historical 2025-01-01 2025-01-31  Get January 2025 data
+"""
 
-Commands:
-  python run.py                           - Start the API server
-  python run.py server                    - Start the API server
-  python run.py pipeline                  - Run daily data pipeline (last 1 day)
-  python run.py pipeline --days 7         - Run pipeline for last 7 days
-  python run.py historical YYYY-MM-DD YYYY-MM-DD - Run historical pipeline
-  python run.py help                      - Show this help
+def parse_date(value: str) -> str:
+    """Validate a YYYY-MM-DD command line date"""
+    try:
+        datetime.strptime(value, '%Y-%m-%d')
+    except ValueError:
+        raise argparse.ArgumentTypeError("Invalid date format. Use YYYY-MM-DD")
+    return value
 
-Examples:
-  python run.py pipeline --days 30        - Get last 30 days of data
-  python run.py historical 2025-01-01 2025-01-31 - Get January 2025 data
-    """)
+def build_parser() -> argparse.ArgumentParser:
+    """Build the command line parser; with no command the API server is started"""
+    parser = argparse.ArgumentParser(
+        description="RAG Agent System",
+        epilog=USAGE_EXAMPLES,
+        formatter_class=argparse.RawDescriptionHelpFormatter
+    )
+    commands = parser.add_subparsers(dest="command")
+    
+    commands.add_parser("server", help="Start the API server")
+    
+    pipeline_parser = commands.add_parser("pipeline", help="Run daily data pipeline")
+    pipeline_parser.add_argument("--days", type=int, default=1, help="Number of days to fetch (default: 1)")
+    
+    historical_parser = commands.add_parser("historical", help="Run historical pipeline")
+    historical_parser.add_argument("start_date", type=parse_date, help="First day to fetch (YYYY-MM-DD)")
+    historical_parser.add_argument("end_date", type=parse_date, help="Last day to fetch (YYYY-MM-DD)")
+    
+    commands.add_parser("help", help="Show this help")
+    
+    return parser
 
 if __name__ == "__main__":
-    if len(sys.argv) == 1 or (len(sys.argv) == 2 and sys.argv[1] == "server"):
-        # Run API server
+    # Heavy modules (uvicorn, the API app, the pipeline) are imported only by the command that needs them
+    parser = build_parser()
+    args = parser.parse_args()
+    
+    if args.command in (None, "server"):
         run_api_server()
         
-    elif sys.argv[1] == "pipeline":
-        # Run data pipeline
-        days_back = 1
-        if len(sys.argv) >= 4 and sys.argv[2] == "--days":
-            try:
-                days_back = int(sys.argv[3])
-            except ValueError:
-                print("Error: Invalid number of days")
-                sys.exit(1)
-        
-        success = asyncio.run(run_data_pipeline(days_back))
+    elif args.command == "pipeline":
+        success = asyncio.run(run_data_pipeline(args.days))
         sys.exit(0 if success else 1)
         
-    elif sys.argv[1] == "historical":
-        # Run historical pipeline
-        if len(sys.argv) != 4:
-            print("Error: Historical pipeline requires start and end dates")
-            print("Usage: python run.py historical YYYY-MM-DD YYYY-MM-DD")
-            sys.exit(1)
-        
-        start_date = sys.argv[2]
-        end_date = sys.argv[3]
-        
-        # Validate date format
-        try:
-            datetime.strptime(start_date, '%Y-%m-%d')
-            datetime.strptime(end_date, '%Y-%m-%d')
-        except ValueError:
-            print("Error: Invalid date format. Use YYYY-MM-DD")
-            sys.exit(1)
-        
-        success = asyncio.run(run_historical_pipeline(start_date, end_date))
+    elif args.command == "historical":
+        success = asyncio.run(run_historical_pipeline(args.start_date, args.end_date))
         sys.exit(0 if success else 1)
         
-    elif sys.argv[1] == "help":
-        print_usage()
-        
-    else:
-        print(f"Error: Unknown command '{sys.argv[1]}'")
-        print_usage()
-        sys.exit(1)
+    elif args.command == "help":
+        parser.print_help()
@@ -0,0 +1,28 @@
+from agent.intent_router import route
+
+
+def test_explicit_days_win_over_generic_recent_phrase():
+    assert route("Show me recent documents from the last 30 days") == ("get_recent_documents", {"days": 30})
+    assert route("latest regulations over the past 14 days") == ("get_recent_documents", {"days": 14})
+
+
+def test_generic_recent_phrase_uses_tool_defaults():
+    assert route("What are the latest regulations?") == ("get_recent_documents", {})
+
+
+def test_stats_phrases():
+    assert route("How many documents are there?") == ("get_document_stats", {})
+    assert route("Show me database statistics") == ("get_document_stats", {})
+
+
+def test_specific_questions_are_left_to_the_llm():
+    assert route("How many documents from EPA mention water?") is None
+    assert route("What did the EPA publish about water?") is None
+
+
+def test_topical_queries_are_left_to_the_llm():
+    assert route("Find documents from the Bureau of Labor Statistics") is None
+    assert route("What are the stats on FDA food recalls?") is None
+    assert route("Show recent documents about climate change from the EPA") is None
+    assert route("latest rules on crypto from the SEC") is None
+    assert route("recent documents about water from the last 30 days") is None
@@ -1,52 +1,100 @@
+from asyncmy.cursors import DictCursor, SSCursor
+from config.settings import AGENT_CONFIG
 from database.connection import db
-from typing import List, Dict, Any
-import json
+from collections import OrderedDict
+from typing import Callable, List, Dict, Any, Tuple
+import functools
+import orjson
 import logging
+import time
 
 logger = logging.getLogger(__name__)
 
+# Seconds a tool result stays cached; the pipeline also clears the cache after each ingest
+RESULT_CACHE_TTL = 300
+RESULT_CACHE_SIZE = 256
+
+# Results are read by the LLM, so indentation only costs bytes unless debugging
+_JSON_OPTIONS = orjson.OPT_INDENT_2 if AGENT_CONFIG['pretty_tool_results'] else 0
+
+# (tool name, args, kwargs) -> (cached_at, result), in least-recently-used order
+_result_cache: OrderedDict[Tuple, Tuple[float, str]] = OrderedDict()
+
+# Other caches built on tool results, cleared together with the result cache
+_invalidation_callbacks: List[Callable[[], None]] = []
+
+def _ttl_cached(func):
+    """Serve repeated calls with the same arguments from memory for RESULT_CACHE_TTL seconds"""
+    @functools.wraps(func)
+    async def wrapper(*args, **kwargs):
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        entry = _result_cache.get(key)
+        if entry and time.monotonic() - entry[0] < RESULT_CACHE_TTL:
+            _result_cache.move_to_end(key)
+            return entry[1]
+        
+        result = await func(*args, **kwargs)
+        
+        # Failures are reported as "Error ..." strings; never cache those
+        if not result.startswith("Error"):
+            _result_cache[key] = (time.monotonic(), result)
+            _result_cache.move_to_end(key)
+            if len(_result_cache) > RESULT_CACHE_SIZE:
+                _result_cache.popitem(last=False)
+        return result
+    return wrapper
+
 class SQLTools:
     @staticmethod
+    def invalidate_cache():
+        """Drop all cached tool results, e.g. after new documents are stored"""
+        _result_cache.clear()
+        for callback in _invalidation_callbacks:
+            callback()
+    
+    @staticmethod
+    def on_invalidate(callback: Callable[[], None]):
+        """Register a callback to clear a dependent cache whenever invalidate_cache runs"""
+        _invalidation_callbacks.append(callback)
+    
+    @staticmethod
+    @_ttl_cached
     async def search_documents(query: str, limit: int = 10) -> str:
         """Search federal documents by keyword"""
         try:
             async with db.get_connection() as conn:
-                async with conn.cursor() as cursor:
+                # Rows arrive as dicts built by the driver, ready to serialize
+                async with conn.cursor(DictCursor) as cursor:
                     sql = """
-                    SELECT document_number, title, abstract, publication_date, agency, document_type
+                    SELECT document_number, title, LEFT(abstract, 500) AS abstract,
+                           CHAR_LENGTH(abstract) AS abstract_length, publication_date, agency, document_type
                     FROM federal_documents 
-                    WHERE title LIKE %s OR abstract LIKE %s 
+                    WHERE MATCH(title, abstract) AGAINST (%s IN NATURAL LANGUAGE MODE)
                     ORDER BY publication_date DESC 
                     LIMIT %s
                     """
-                    search_term = f"%{query}%"
-                    await cursor.execute(sql, (search_term, search_term, limit))
-                    results = await cursor.fetchall()
+                    # Abstracts are truncated by the server so long ones never cross the wire
+                    await cursor.execute(sql, (query, limit))
+                    documents = await cursor.fetchall()
                     
-                    documents = []
-                    for row in results:
-                        documents.append({
-                            'document_number': row[0],
-                            'title': row[1],
-                            'abstract': row[2][:500] + "..." if row[2] and len(row[2]) > 500 else row[2],
-                            'publication_date': str(row[3]) if row[3] else None,
-                            'agency': row[4],
-                            'document_type': row[5]
-                        })
+                    for doc in documents:
+                        if (doc.pop('abstract_length') or 0) > 500:
+                            doc['abstract'] += "..."
                     
                     logger.info(f"Search for '{query}' returned {len(documents)} results")
-                    return json.dumps(documents, indent=2) if documents else json.dumps([])
+                    return orjson.dumps(documents, option=_JSON_OPTIONS).decode()
                     
         except Exception as e:
             logger.error(f"Error searching documents: {e}")
             return f"Error searching documents: {e}"
     
     @staticmethod
+    @_ttl_cached
     async def get_recent_documents(days: int = 7, limit: int = 20) -> str:
         """Get recent documents from the last N days"""
         try:
             async with db.get_connection() as conn:
-                async with conn.cursor() as cursor:
+                async with conn.cursor(DictCursor) as cursor:
                     sql = """
                     SELECT document_number, title, publication_date, agency, document_type
                     FROM federal_documents 
@@ -55,97 +103,99 @@ class SQLTools:
                     LIMIT %s
                     """
                     await cursor.execute(sql, (days, limit))
-                    results = await cursor.fetchall()
-                    
-                    documents = []
-                    for row in results:
-                        documents.append({
-                            'document_number': row[0],
-                            'title': row[1],
-                            'publication_date': str(row[2]) if row[2] else None,
-                            'agency': row[3],
-                            'document_type': row[4]
-                        })
+                    documents = await cursor.fetchall()
                     
                     logger.info(f"Retrieved {len(documents)} recent documents from last {days} days")
-                    return json.dumps(documents, indent=2) if documents else json.dumps([])
+                    return orjson.dumps(documents, option=_JSON_OPTIONS).decode()
                     
         except Exception as e:
             logger.error(f"Error getting recent documents: {e}")
             return f"Error getting recent documents: {e}"
     
     @staticmethod
+    @_ttl_cached
     async def filter_by_agency(agency: str, limit: int = 15) -> str:
-        """Filter documents by agency"""
+        """Filter documents by agency.
+        
+        The agency column joins all issuing agencies with commas, so the prefix
+        match only finds documents whose first listed agency matches.
+        """
         try:
             async with db.get_connection() as conn:
-                async with conn.cursor() as cursor:
+                async with conn.cursor(DictCursor) as cursor:
                     sql = """
-                    SELECT document_number, title, abstract, publication_date, document_type
+                    SELECT document_number, title, LEFT(abstract, 300) AS abstract,
+                           CHAR_LENGTH(abstract) AS abstract_length, publication_date, document_type
                     FROM federal_documents 
                     WHERE agency LIKE %s 
                     ORDER BY publication_date DESC 
                     LIMIT %s
                     """
-                    agency_term = f"%{agency}%"
+                    # A prefix match can range-scan idx_agency_date, unlike a leading wildcard;
+                    # being a range, the date ordering is still a filesort over the matched rows
+                    agency_term = f"{agency}%"
                     await cursor.execute(sql, (agency_term, limit))
-                    results = await cursor.fetchall()
+                    documents = await cursor.fetchall()
                     
-                    documents = []
-                    for row in results:
-                        documents.append({
-                            'document_number': row[0],
-                            'title': row[1],
-                            'abstract': row[2][:300] + "..." if row[2] and len(row[2]) > 300 else row[2],
-                            'publication_date': str(row[3]) if row[3] else None,
-                            'document_type': row[4]
-                        })
+                    for doc in documents:
+                        if (doc.pop('abstract_length') or 0) > 300:
+                            doc['abstract'] += "..."
                     
                     logger.info(f"Filter by agency '{agency}' returned {len(documents)} results")
-                    return json.dumps(documents, indent=2) if documents else json.dumps([])
+                    return orjson.dumps(documents, option=_JSON_OPTIONS).decode()
                     
         except Exception as e:
             logger.error(f"Error filtering by agency: {e}")
             return f"Error filtering by agency: {e}"
     
     @staticmethod
+    @_ttl_cached
     async def get_document_stats() -> str:
         """Get basic statistics about the document database"""
         try:
             async with db.get_connection() as conn:
-                async with conn.cursor() as cursor:
-                    # Total documents
-                    await cursor.execute("SELECT COUNT(*) FROM federal_documents")
-                    total_docs = (await cursor.fetchone())[0]
-                    
-                    # Documents by type
+                # Unbuffered cursor: rows stream from the server and are aggregated as they arrive
+                async with conn.cursor(SSCursor) as cursor:
+                    # Total, top types and recent activity in one round-trip, tagged by kind
                     await cursor.execute("""
-                        SELECT document_type, COUNT(*) as count 
-                        FROM federal_documents 
-                        GROUP BY document_type 
-                        ORDER BY count DESC 
-                        LIMIT 5
+                        (SELECT 'total' AS kind, NULL AS label, COUNT(*) AS count
+                         FROM federal_documents)
+                        UNION ALL
+                        (SELECT 'type', document_type, COUNT(*) AS count
+                         FROM federal_documents 
+                         GROUP BY document_type 
+                         ORDER BY count DESC 
+                         LIMIT 5)
+                        UNION ALL
+                        (SELECT 'date', DATE(publication_date), COUNT(*)
+                         FROM federal_documents 
+                         WHERE publication_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
+                         GROUP BY DATE(publication_date)
+                         ORDER BY DATE(publication_date) DESC
+                         LIMIT 10)
                     """)
-                    doc_types = await cursor.fetchall()
+                    total_docs = 0
+                    doc_types = []
+                    recent_activity = []
+                    async for kind, label, count in cursor:
+                        if kind == 'total':
+                            total_docs = count
+                        elif kind == 'type':
+                            doc_types.append({'type': label, 'count': count})
+                        else:
+                            recent_activity.append({'date': label, 'count': count})
                     
-                    # Recent activity
-                    await cursor.execute("""
-                        SELECT DATE(publication_date) as date, COUNT(*) as count
-                        FROM federal_documents 
-                        WHERE publication_date >= DATE_SUB(CURDATE(), INTERVAL 30 DAY)
-                        GROUP BY DATE(publication_date)
-                        ORDER BY date DESC
-                        LIMIT 10
-                    """)
-                    recent_activity = await cursor.fetchall()
+                    # UNION ALL does not guarantee the branches keep their own ordering
+                    doc_types.sort(key=lambda item: item['count'], reverse=True)
+                    recent_activity.sort(key=lambda item: item['date'], reverse=True)
                     
                     stats = {
                         'total_documents': total_docs,
-                        'document_types': [{'type': row[0], 'count': row[1]} for row in doc_types],
-                        'recent_activity': [{'date': str(row[0]), 'count': row[1]} for row in recent_activity]
+                        'document_types': doc_types,
+                        'recent_activity': recent_activity
                     }
                     
-                    return json.dumps(stats, indent=2)
+                    return orjson.dumps(stats, option=_JSON_OPTIONS).decode()
                     
         except Exception as e:
             logger.error(f"Error getting document stats: {e}")